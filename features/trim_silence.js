@@ -25,6 +25,22 @@ async function gatherAudioContext() {
     return audioFilePath;
 }
 
+/**
+ * Reads the active sequence frame rate so the server can snap cuts to frames.
+ * @returns {Promise<number|null>} Frames per second, or null if unavailable.
+ */
+async function getSequenceFrameRate() {
+    try {
+        const project = await app.Project.getActiveProject();
+        const seq = await project.getActiveSequence();
+        const frameDurationTicks = Number(await seq.getTimebase());
+        return frameDurationTicks > 0 ? 254016000000 / frameDurationTicks : null;
+    } catch (e) {
+        console.warn("Could not read sequence frame rate:", e);
+        return null;
+    }
+}
+
 /**
  * Processes the trim silence payload from AI.
  * @param {Object} payload - The payload containing segments.
@@ -239,5 +255,6 @@ async function exportAudioForAnalysis() {
 
 module.exports = {
     gatherAudioContext,
+    getSequenceFrameRate,
     processTrimSilence
 };
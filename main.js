@@ -13,7 +13,7 @@
 //  GLOBAL IMPORTS & CONSTANTS
 // ============================================================================
 const { executeAICommands } = require('./ai_decoder.js');
-const { gatherAudioContext } = require('./features/trim_silence.js');
+const { gatherAudioContext, getSequenceFrameRate } = require('./features/trim_silence.js');
 const { gatherClipContext } = require('./features/add_transition.js');
 const { gatherAudioContextCurseWord } = require('./features/curseword_detection.js');
 const { generateSimpleUniqueId } = require('./uniquesession_id.js'); // Import Session Generator
@@ -163,10 +163,12 @@ document.addEventListener("DOMContentLoaded", () => {
             let body = {
                 session_id: currentSessionId,
                 message: messageText,
+                required_tools: intentData.required_tools, // Server binds only these tools
             };
 
             if (contextData["trim_silence"]) {
                 body.audio_file_path = contextData["trim_silence"];
+                body.sequence_frame_rate = await getSequenceFrameRate();
             }
             if (contextData["add_transition"]) {
                 console.log("path: ", contextData["add_transition"]);
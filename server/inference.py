@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import atexit
+import secrets
+import subprocess
+import functools
+import threading
+from multiprocessing.connection import Listener, Client
+from var import INFERENCE_ADDRESS, INFERENCE_AUTHKEY, INFERENCE_CONCURRENCY
+
+# How long API workers keep retrying while the inference process loads its models
+CONNECT_TIMEOUT_SECONDS = 120
+
+_tasks = {}                     # name -> local function
+_serving = False                # True inside the inference process itself
+_local = threading.local()      # One socket per API worker thread
+_task_slots = threading.BoundedSemaphore(INFERENCE_CONCURRENCY)    # Model jobs running at once (all workers)
+
+
+def parse_address(address: str):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+# --- MAIN: TASK REGISTRATION ---
+def inference_task(name: str):
+    """
+    Marks a model-backed function as an inference task.
+
+    Without INFERENCE_ADDRESS (single process) the function runs in-process, as
+    before. With it (multi-worker mode) API workers forward the call over a local
+    socket to the inference process, which is the only one holding the models.
+    Arguments and results must be picklable.
+    """
+    def decorator(fn):
+        _tasks[name] = fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if INFERENCE_ADDRESS and not _serving:
+                return call_remote(name, *args, **kwargs)
+            return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def get_authkey() -> bytes:
+    # The socket carries pickles, so it is never opened with a known or empty key
+    if not INFERENCE_AUTHKEY:
+        raise RuntimeError("INFERENCE_AUTHKEY must be set when INFERENCE_ADDRESS is used.")
+    return INFERENCE_AUTHKEY.encode()
+
+
+# --- HELPER: CLIENT (API WORKERS) ---
+def _connect():
+    authkey = get_authkey()
+    deadline = time.monotonic() + CONNECT_TIMEOUT_SECONDS
+    while True:
+        try:
+            return Client(parse_address(INFERENCE_ADDRESS), authkey=authkey)
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Inference server not reachable at {INFERENCE_ADDRESS}")
+            print("⏳ Waiting for inference server...")
+            time.sleep(1)
+
+def call_remote(name: str, *args, **kwargs):
+    for attempt in range(2):
+        conn = getattr(_local, "conn", None)
+        if conn is None:
+            conn = _local.conn = _connect()
+        try:
+            conn.send((name, args, kwargs))
+            status, value = conn.recv()
+            break
+        except (EOFError, OSError):
+            # Inference process restarted - reconnect once
+            _local.conn = None
+            if attempt == 1:
+                raise RuntimeError("Lost connection to inference server.")
+
+    if status == "error":
+        raise RuntimeError(value)
+    return value
+
+
+# --- HELPER: SERVER (INFERENCE PROCESS) ---
+def _handle(conn):
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                with _task_slots:
+                    result = _tasks[name](*args, **kwargs)
+                conn.send(("ok", result))
+            except Exception as e:
+                # Exceptions are sent as text: not every exception type survives pickling
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+def load_models():
+    """Importing the tools registers their tasks; then load every model once, up front."""
+    from tools.trim_silence import get_vad_model
+    from tools.curseword_detect import get_whisper_model
+    from tools.add_transition import get_transition_db
+
+    # A model that fails here (e.g. no download access) only breaks its own tool;
+    # it is retried on that tool's first call
+    for loader in (get_vad_model, get_whisper_model, lambda: get_whisper_model(chunked=True), get_transition_db):
+        try:
+            loader()
+        except Exception as e:
+            print(f"⚠️ Could not preload model: {type(e).__name__}: {e}")
+
+def serve():
+    global _serving
+    authkey = get_authkey()
+    _serving = True
+    load_models()
+
+    listener = Listener(parse_address(INFERENCE_ADDRESS), authkey=authkey)
+    print(f"🧠 Inference server ready on {INFERENCE_ADDRESS} ({', '.join(sorted(_tasks))}), "
+          f"{INFERENCE_CONCURRENCY} concurrent jobs")
+
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+def spawn_server(default_address: str = "localhost:8765"):
+    """
+    Starts the inference process for a multi-worker launch. The address and a fresh
+    auth key go into the environment, so the API workers spawned afterwards inherit them.
+    """
+    os.environ["INFERENCE_ADDRESS"] = default_address
+    os.environ["INFERENCE_AUTHKEY"] = secrets.token_hex(16)
+
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=os.environ.copy())
+    atexit.register(process.terminate)
+    print(f"🧠 Started inference server (pid {process.pid}) on {default_address}")
+    return process
+
+
+if __name__ == "__main__":
+    if not INFERENCE_ADDRESS:
+        print("Set INFERENCE_ADDRESS (e.g. localhost:8765) to run the inference server.")
+        sys.exit(1)
+    if not INFERENCE_AUTHKEY:
+        print("Set INFERENCE_AUTHKEY (a long random secret, shared with the API workers) to run the inference server.")
+        sys.exit(1)
+
+    # Import ourselves by name so the tools register into the same module
+    import inference
+    inference.serve()
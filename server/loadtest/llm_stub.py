@@ -0,0 +1,192 @@
+"""
+Local stand-in for the OpenRouter chat-completions API, for offline load tests.
+
+It answers the three kinds of calls the backend makes:
+- Intent classification -> a JSON intent picked from keywords in the message
+- Agent turns with [ACTIVE SESSION DATA] -> scripted tool calls for the paths sent
+- Anything else (tool results, summaries, chat) -> a short text reply
+
+Run standalone:
+    python -m loadtest.llm_stub --port 9100 --latency-ms 200,800
+then start the server with OPENROUTER_BASE_URL=http://localhost:9100/v1
+"""
+import re
+import time
+import json
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INTENT_KEYWORDS = {
+    "trim_silence": ("silence", "pause", "gap", "trim"),
+    "add_transition": ("transition", "dissolve", "connect"),
+    "curseword_detect": ("curse", "profan", "bad word", "swear"),
+}
+
+CONTEXT_PATTERNS = {
+    "trim_silence_tool": re.compile(r"audio_file_path \(for 'trim_silence'\): (.+)"),
+    "curseword_detect_tool": re.compile(r"curseword_detect_path \(for 'curseword_detect'\): (.+)"),
+    "add_transition_tool": re.compile(r"image_transition_path \(for 'add_transition'\): (.+)"),
+}
+
+
+# --- HELPER: READ THE REQUEST ---
+def message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return content
+
+def estimate_tokens(messages: list) -> int:
+    # Rough chars/4 estimate; base64 images count too, which is the point
+    return len(json.dumps(messages)) // 4
+
+
+# --- HELPER: SCRIPTED REPLIES ---
+def intent_tools(user_text: str) -> list[str]:
+    lowered = user_text.lower()
+    return [name for name, words in INTENT_KEYWORDS.items() if any(w in lowered for w in words)]
+
+def intent_reply(user_text: str) -> dict:
+    tools = intent_tools(user_text)
+    reply = None if tools else "Hi! I can trim silence, add transitions, or detect curse words."
+    return {"content": json.dumps({"tools": tools, "reply": reply})}
+
+def tool_call_reply(user_text: str, available_tools: set) -> dict:
+    tool_calls = []
+
+    for tool_name, pattern in CONTEXT_PATTERNS.items():
+        match = pattern.search(user_text)
+        if not match or tool_name not in available_tools:
+            continue
+
+        value = match.group(1).strip()
+        if tool_name == "add_transition_tool":
+            num_cuts = max(1, len(json.loads(value)) - 1)
+            arguments = {
+                "target_vibes_json": json.dumps(["smooth cinematic dissolve"] * num_cuts),
+                "durations_json": json.dumps([0.8] * num_cuts),
+                "img_paths_json": value,
+            }
+        else:
+            arguments = {"audio_path": value}
+
+        tool_calls.append({
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": tool_name, "arguments": json.dumps(arguments)},
+        })
+
+    if not tool_calls:
+        return {"content": "Please select the files first."}
+    return {"content": "", "tool_calls": tool_calls}
+
+def scripted_reply(body: dict) -> dict:
+    messages = body.get("messages", [])
+    available_tools = {t["function"]["name"] for t in body.get("tools", [])}
+    first_text = message_text(messages[0]) if messages else ""
+    last = messages[-1] if messages else {}
+
+    if "Intent Classifier" in first_text:
+        return intent_reply(message_text(last))
+
+    if last.get("role") == "tool":
+        return {"content": "Done! I applied the edits to your sequence."}
+
+    if last.get("role") == "user" and available_tools and "[ACTIVE SESSION DATA]" in message_text(last):
+        return tool_call_reply(message_text(last), available_tools)
+
+    return {"content": "Summary: the user is editing a video with the assistant."}
+
+
+# --- MAIN: HTTP SERVER ---
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def record(self, prompt_tokens: int):
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens}
+
+def make_handler(latency_ms: tuple[int, int], stats: StubStats):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                self._send_json(200, stats.snapshot())
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": "not found"})
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt_tokens = estimate_tokens(body.get("messages", []))
+            stats.record(prompt_tokens)
+
+            time.sleep(random.uniform(*latency_ms) / 1000)
+
+            message = {"role": "assistant", **scripted_reply(body)}
+            self._send_json(200, {
+                "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": 20,
+                    "total_tokens": prompt_tokens + 20,
+                },
+            })
+
+        def log_message(self, *args):
+            pass    # Keep the load-test output readable
+
+    return Handler
+
+def start_stub(host: str, port: int, latency_ms: tuple[int, int]):
+    """Starts the stub in a background thread. Returns (server, stats)."""
+    stats = StubStats()
+    server = ThreadingHTTPServer((host, port), make_handler(latency_ms, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def parse_latency(value: str) -> tuple[int, int]:
+    low, _, high = value.partition(",")
+    return int(low), int(high or low)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stub")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=parse_latency, default=(200, 800), help="min,max per call")
+    args = parser.parse_args()
+
+    server, _ = start_stub(args.host, args.port, args.latency_ms)
+    print(f"LLM stub listening on http://{args.host}:{args.port}/v1")
+    threading.Event().wait()
@@ -0,0 +1,242 @@
+"""
+Offline end-to-end load test for /get_intent and /process_request.
+
+Starts the LLM stub, starts the API server pointed at it (unless --server-url is
+given), then drives concurrent simulated editor sessions that follow the same
+two-step flow as the UXP panel.
+
+Usage (from the server folder):
+    python -m loadtest.run --sessions 20 --turns 3 --latency-ms 200,800
+    python -m loadtest.run --audio "C:\\clips\\interview.wav" --workers 4
+    python -m loadtest.run --tools trim_silence      # Only scenarios using these tools
+
+Needs httpx, from the "dev" dependency group (installed by a plain `uv sync`).
+"""
+import os
+import sys
+import time
+import wave
+import zlib
+import struct
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+import httpx
+import numpy as np
+from loadtest.llm_stub import start_stub, parse_latency, intent_tools
+
+SCENARIOS = [
+    "Hi, how are you?",
+    "Please trim the silence from this interview.",
+    "Find and mark the curse words.",
+    "Add a transition between my clips.",
+    "Trim the silence and add a transition.",
+]
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOL_FIELDS = {
+    "trim_silence": "audio_file_path",
+    "curseword_detect": "curseword_detect_path",
+    "add_transition": "image_transition_path",
+}
+
+
+# --- HELPER: TEST MEDIA ---
+def write_speech_like_wav(path: str, seconds: float, seed: int, sample_rate: int = 48000):
+    """Stereo 16-bit WAV of noise bursts shaped like syllables, with pauses in between."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+
+    # ~4 Hz syllable envelope, switched on and off in 0.5-3 s phrases
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    phrase_edges = np.cumsum(rng.uniform(0.5, 3.0, size=int(seconds) + 1))
+    talking = (np.searchsorted(phrase_edges, t) % 2) == 0
+    voice = np.sin(2 * np.pi * 140 * t) * 0.3 + rng.normal(0, 0.1, t.size)
+    mono = voice * envelope * talking + rng.normal(0, 0.002, t.size)
+
+    pcm = (np.clip(mono, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.repeat(pcm, 2).tobytes())
+
+def write_png(path: str, rgb: np.ndarray):
+    """Minimal PNG writer (RGB, 8-bit) so the harness needs no imaging library."""
+    height, width, _ = rgb.shape
+    raw = b"".join(b"\x00" + rgb[y].astype(np.uint8).tobytes() for y in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+
+def write_clip_frames(folder: str, num_clips: int, seed: int) -> list[list[str]]:
+    """One head and one tail frame per clip, as the panel exports them (paths without .png)."""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for c in range(num_clips):
+        base_color = rng.uniform(0, 255, size=3)
+        clip_paths = []
+        for position in ("head", "tail"):
+            gradient = np.linspace(0.6, 1.4, 320)[None, :, None]
+            frame = np.clip(base_color * gradient + rng.normal(0, 12, (180, 320, 3)), 0, 255)
+            path = os.path.join(folder, f"clip{seed}_{c}_{position}")
+            write_png(path + ".png", frame)
+            clip_paths.append(path)
+        clips.append(clip_paths)
+    return clips
+
+
+# --- HELPER: SERVER PROCESS ---
+def start_server(port: int, stub_url: str, workers: int) -> subprocess.Popen:
+    env = os.environ.copy()
+    env.update({
+        "OPENROUTER_BASE_URL": stub_url,
+        "OPENROUTER_API_KEY": "stub-key",
+        "HOST": "localhost",
+        "PORT": str(port),
+        "WORKERS": str(workers),
+    })
+    return subprocess.Popen([sys.executable, "main.py"], env=env, cwd=SERVER_DIR)
+
+async def wait_for_server(url: str, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{url}/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(1)
+    raise RuntimeError(f"Server at {url} did not come up in {timeout}s")
+
+
+# --- MAIN: SESSIONS ---
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, status):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+async def timed_post(client, recorder: Recorder, url: str, endpoint: str, body: dict):
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{url}{endpoint}", json=body)
+        recorder.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+    except httpx.HTTPError as e:
+        recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+        return None
+
+async def run_session(index: int, args, url: str, media: dict, recorder: Recorder):
+    session_id = f"loadtest-{index}-{random.randint(0, 1_000_000)}"
+
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        for _ in range(args.turns):
+            message = random.choice(args.scenarios)
+
+            intent = await timed_post(client, recorder, url, "/get_intent", {"session_id": session_id, "message": message})
+            if intent is None or intent.status_code != 200:
+                continue
+
+            required_tools = intent.json().get("required_tools") or []
+            if not required_tools:
+                continue
+
+            body = {"session_id": session_id, "message": message, "required_tools": required_tools}
+            for tool_name in required_tools:
+                body[TOOL_FIELDS[tool_name]] = media[tool_name]
+
+            await timed_post(client, recorder, url, "/process_request", body)
+            await asyncio.sleep(random.uniform(0, args.think_time))
+
+def build_media(args, workdir: str, index: int) -> dict:
+    if args.audio:
+        audio_path = args.audio
+    else:
+        # A different file per session, so caches and coalescing don't hide the real cost
+        audio_path = os.path.join(workdir, f"session{index}.wav")
+        write_speech_like_wav(audio_path, args.audio_seconds, seed=index)
+
+    return {
+        "trim_silence": audio_path,
+        "curseword_detect": audio_path,
+        "add_transition": write_clip_frames(workdir, args.clips, seed=index),
+    }
+
+def report(recorder: Recorder, elapsed: float, stub_stats: dict):
+    print(f"\n--- LOAD TEST RESULTS ({elapsed:.1f}s) ---")
+    for endpoint, latencies in recorder.latencies.items():
+        statuses = recorder.statuses[endpoint]
+        total = len(latencies)
+        ok = statuses.get(200, 0)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+        print(f"{endpoint}")
+        print(f"  requests {total} | throughput {total / elapsed:.2f} req/s")
+        print(f"  latency p50 {p50:.2f}s | p95 {p95:.2f}s | p99 {p99:.2f}s")
+        print(f"  errors {(total - ok) / total:.1%} | statuses {dict(statuses)}")
+
+    if stub_stats["calls"]:
+        print(f"LLM stub: {stub_stats['calls']} calls, "
+              f"{stub_stats['prompt_tokens'] / stub_stats['calls']:.0f} prompt tokens/call (estimated)")
+
+async def main(args):
+    stub_server, stub = start_stub("localhost", args.stub_port, args.latency_ms)
+    stub_url = f"http://localhost:{args.stub_port}/v1"
+    print(f"LLM stub on {stub_url} (latency {args.latency_ms[0]}-{args.latency_ms[1]} ms)")
+
+    server = None
+    url = args.server_url
+    if not url:
+        url = f"http://localhost:{args.port}"
+        server = start_server(args.port, stub_url, args.workers)
+
+    try:
+        await wait_for_server(url)
+
+        workdir = tempfile.mkdtemp(prefix="premiere_loadtest_")
+        print(f"Generating test media in {workdir}...")
+        media = [build_media(args, workdir, i) for i in range(args.sessions)]
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(i, args, url, media[i], recorder) for i in range(args.sessions)))
+        report(recorder, time.perf_counter() - start, stub.snapshot())
+    finally:
+        stub_server.shutdown()
+        if server:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test with a local LLM stub")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent editor sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Messages per session")
+    parser.add_argument("--latency-ms", type=parse_latency, default=(200, 800), help="Stub latency min,max")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Max pause between turns (s)")
+    parser.add_argument("--audio", help="Use this WAV for every session instead of synthetic audio")
+    parser.add_argument("--audio-seconds", type=float, default=60)
+    parser.add_argument("--clips", type=int, default=4, help="Clips per transition request")
+    parser.add_argument("--workers", type=int, default=1, help="WORKERS for the spawned server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--server-url", help="Test a running server (started with OPENROUTER_BASE_URL=<stub url>) instead of spawning one")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--tools", help="Comma-separated tools to exercise, e.g. trim_silence (default: all)")
+    args = parser.parse_args()
+
+    # Scenarios whose tools are all allowed (plain chat always is)
+    allowed = set(args.tools.split(",")) if args.tools else set(TOOL_FIELDS)
+    args.scenarios = [s for s in SCENARIOS if set(intent_tools(s)) <= allowed]
+    asyncio.run(main(args))
@@ -4,15 +4,23 @@ import time
 import json
 import base64
 import sqlite3
-from var import OPENROUTER_API_KEY, llm
+import asyncio
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from var import OPENROUTER_API_KEY, TRANSITION_VISION_MODE, HOST, PORT, WORKERS, INFERENCE_ADDRESS, CHECKPOINT_DB, llm
 import uuid
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from tools.trim_silence import trim_silence_tool
 from tools.add_transition import add_transition_tool
 from tools.curseword_detect import curseword_detect_tool
+from tools.frame_features import compute_cut_profile, describe_cut_profile
+from scheduler import scheduler
+from singleflight import AsyncSingleFlight
+from result_store import load_result
+import inference
 
 # LangChain & LangGraph
 
@@ -29,28 +37,41 @@ if not OPENROUTER_API_KEY:
 
 
 # --- LANGGRAPH SETUP ---
-# 2. Bind Tools
-tools = [trim_silence_tool, add_transition_tool, curseword_detect_tool]
-llm_with_tools = llm.bind_tools(tools)
+# 2. Tools (keyed by the intent names /get_intent returns)
+TOOLS_BY_INTENT = {
+    "trim_silence": trim_silence_tool,
+    "add_transition": add_transition_tool,
+    "curseword_detect": curseword_detect_tool,
+}
+ALL_INTENTS = frozenset(TOOLS_BY_INTENT)
 
 # 3. Define Nodes
 # --- A. Modified Agent Node ---
 class State(MessagesState):
     summary: str
 
-def agent_node(state: State):
-    summary = state.get("summary", "")
-    
-    # If there is a summary, add it as a SystemMessage context
-    if summary:
-        # We put the summary BEFORE the rest of the messages
-        summary_message = SystemMessage(content=f"Previous Conversation Summary: {summary}")
-        messages = [summary_message] + state["messages"]
-    else:
-        messages = state["messages"]
+def make_agent_node(intents: frozenset):
+    # Only the tools this turn needs are bound, so their schemas are the only ones sent
+    llm_with_tools = llm.bind_tools([TOOLS_BY_INTENT[name] for name in TOOL_ORDER if name in intents])
+    turn_system_prompt = SystemMessage(content=build_system_prompt(intents))
+
+    def agent_node(state: State):
+        summary = state.get("summary", "")
+
+        # The system prompt is built per turn (not stored in the checkpoint), so it only
+        # carries the rule sections of the bound tools. Prompts saved by older sessions are skipped.
+        messages = [m for m in state["messages"] if not isinstance(m, SystemMessage)]
         
-    response = llm_with_tools.invoke(messages)
-    return {"messages": [response]}
+        # If there is a summary, add it as a SystemMessage context
+        if summary:
+            # We put the summary BEFORE the rest of the messages
+            summary_message = SystemMessage(content=f"Previous Conversation Summary: {summary}")
+            messages = [summary_message] + messages
+            
+        response = llm_with_tools.invoke([turn_system_prompt] + messages)
+        return {"messages": [response]}
+
+    return agent_node
 
 
 # --- B. The Summarization Node ---
@@ -108,36 +129,61 @@ def should_continue(state: State):
     return END
 
 # 4. Build Graph
-builder = StateGraph(State)
-
-builder.add_node("agent", agent_node)
-builder.add_node("tools", ToolNode(tools))
-builder.add_node("summarize_conversation", summarize_conversation)
-
-builder.add_edge(START, "agent")
-
-builder.add_conditional_edges(
-    "agent", 
-    should_continue, 
-    {
-        "tools": "tools",
-        "summarize_conversation": "summarize_conversation", 
-        END: END
-    }
-)
-
-builder.add_edge("tools", "agent")
-builder.add_edge("summarize_conversation", END) # After summarizing, we stop for this turn
-
 # Compile
-conn = sqlite3.connect("checkpoints.sqlite", check_same_thread=False)
+conn = sqlite3.connect(CHECKPOINT_DB, check_same_thread=False, timeout=30)
+# WAL + busy timeout: several worker processes can share the checkpoint file safely
+conn.execute("PRAGMA journal_mode=WAL")
+conn.execute("PRAGMA busy_timeout=30000")
 memory = SqliteSaver(conn)
-graph = builder.compile(checkpointer=memory)
+
+def run_tool_in_slot(tool_request, execute):
+    """Every tool call takes a slot in the (bounded) tool lane, only for as long as the tool runs."""
+    with scheduler.tools.slot():
+        return execute(tool_request)
+
+@lru_cache(maxsize=None)
+def get_graph(intents: frozenset = ALL_INTENTS):
+    """
+    One compiled graph per tool subset (at most 7), all sharing the same checkpointer,
+    so a session keeps its history whichever variant runs its next turn.
+    """
+    builder = StateGraph(State)
+
+    builder.add_node("agent", make_agent_node(intents))
+    builder.add_node("tools", ToolNode(
+        [TOOLS_BY_INTENT[name] for name in intents], wrap_tool_call=run_tool_in_slot
+    ))
+    builder.add_node("summarize_conversation", summarize_conversation)
+
+    builder.add_edge(START, "agent")
+
+    builder.add_conditional_edges(
+        "agent", 
+        should_continue, 
+        {
+            "tools": "tools",
+            "summarize_conversation": "summarize_conversation", 
+            END: END
+        }
+    )
+
+    builder.add_edge("tools", "agent")
+    builder.add_edge("summarize_conversation", END) # After summarizing, we stop for this turn
+
+    return builder.compile(checkpointer=memory)
 
 
 # --- FASTAPI SERVER ---
 
-app = FastAPI(title="Premiere Pro Agentic Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Single-process mode: load the models at startup instead of on the first request.
+    # In multi-worker mode they live in the inference process instead.
+    if not INFERENCE_ADDRESS:
+        await asyncio.to_thread(inference.load_models)
+    yield
+
+app = FastAPI(title="Premiere Pro Agentic Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -159,6 +205,10 @@ class ToolsRequest(BaseModel):
     audio_file_path: Optional[str] = None                       # Trim Silence
     image_transition_path: Optional[List[List[str]]] = None     # Add Transition
     curseword_detect_path: Optional[str] = None                 # Curse Word Detection
+    transition_vision_mode: Optional[Literal["images", "auto", "features"]] = None   # None = TRANSITION_VISION_MODE
+    trim_silence_options: Optional[Dict[str, float]] = None     # Trim Silence post-processing overrides
+    sequence_frame_rate: Optional[float] = None                 # Trim Silence cut snapping
+    required_tools: Optional[List[str]] = None                  # From /get_intent; None = all tools
 
 class ToolCommand(BaseModel):
     action: str
@@ -199,20 +249,28 @@ system_prompt = (
       - *Good Example*: "I added a 0.5s Glitch transition to the first cut and a smooth 1.0s Dissolve to the second. I also trimmed the silence from 0s to 1.2s."
       - *Bad Example*: "Action completed. JSON payload sent."
     - **No Tech Jargon**: Do not bore the user with "JSON arrays" or "float values" unless they ask.
-    - **Stay Grounded**: Only recommend next steps if they involve the 3 tools above. Do not offer to color grade, generate subtitles, or fetch coffee.
+    - **Stay Grounded**: Only recommend next steps if they involve the 3 tools above. Do not offer to color grade, generate subtitles, or fetch coffee."""
+)
 
+# Tool-specific rule sections, only included for the tools bound this turn
+TOOL_RULES = {
+    "trim_silence": """
     RULES for 'trim_silence':
     1. **Output Summary**: Use the 'count' from the tool result to report how many gaps were removed. 
        - *Example*: "I detected and removed 14 silent pauses to tighten up the flow."
-    2. **Detail Level**: Do not list the start/end times of every silence unless the user explicitly asks for technical details. Keep it high-level.
+    2. **Detail Level**: Keep it high-level. You can mention 'total_removed_seconds'. The individual timestamps are sent straight to Premiere Pro, you only receive the summary.""",
 
+    "curseword_detect": """
     RULES for 'curseword_detect':
     1. **Context Matters**: If the user mentions specific words to block (e.g., "Also flag the word 'banana'"), pass them into the 'additional_bad_words' argument.
-    2. **Output Summary**: When the tool returns, report the *number* of bad words found. Do not list every single curse word in the chat unless specifically asked (to keep the chat clean).
+    2. **Output Summary**: When the tool returns, report the *number* of bad words found. The markers themselves are placed on the timeline automatically, so point the user there for the details.""",
 
+    "add_transition": """
     RULES for 'add_transition_tool':
     1. **Count Check**: Look for "Target Cut Count" in the system note. Your output lists MUST have exactly that many items.
     2. **Visual Analysis (CRITICAL)**: Act like a Film Director. Look at the [ACTIVE SESSION DATA].
+       - Read the [Cut Profiles] first. Each line describes one cut: luma (brightness 0-1, outgoing->incoming), color distance (0 = same palette, 1 = totally different), edge density (detail/busyness), frame difference (0-1) and a verdict (same_scene / scene_change / ambiguous).
+       - Depending on the vision mode, images are attached for every cut, only for cuts the profile cannot settle, or not at all. If there are no images for a cut, trust its profile.
        - Compare the Color/Lighting between the two shots.
        - Compare the Movement (Static vs. Action).
        - **Do NOT default to generic 'glitch' or 'dissolve'**. 
@@ -224,8 +282,14 @@ system_prompt = (
          - Standard -> 0.5 - 1.0s
          - Smooth/Dreamy -> 1.0 - 2.0s
     4. **Data Handling**: Simply COPY 'img_paths_json' from the context. Retain the double backslashes.
-    5. **Execution**: **CALL THE TOOL.** Do not just describe the plan. Call the function with the parameters you decided on."""
-)
+    5. **Execution**: **CALL THE TOOL.** Do not just describe the plan. Call the function with the parameters you decided on.""",
+}
+TOOL_ORDER = ["trim_silence", "curseword_detect", "add_transition"]
+
+def build_system_prompt(intents: frozenset) -> str:
+    sections = [system_prompt] + [TOOL_RULES[name] for name in TOOL_ORDER if name in intents]
+    return "\n".join(sections)
+
 
 intent_system_prompt = SystemMessage(content="""
     You are the "Intent Classifier" for an Adobe Premiere Pro AI Agent.
@@ -334,7 +398,8 @@ async def get_intent_endpoint(request: IntentRequest):
     if not user_msg_content:
         raise HTTPException(status_code=400, detail="No message provided.")
 
-    intent = get_intent(user_msg_content)
+    # Chat lane: never queued behind tool work
+    intent = await scheduler.submit(scheduler.interactive, None, get_intent, user_msg_content)
 
     return IntentResponse(
         required_tools=intent["tools"],
@@ -342,24 +407,41 @@ async def get_intent_endpoint(request: IntentRequest):
     )
 
 
+# Identical retries (UXP timeout, double-click) attach to the request already running
+# (within one worker process; with WORKERS > 1 a retry may land on another worker)
+request_flight = AsyncSingleFlight()
+
 @traceable
 @app.post("/process_request", response_model=ChatResponse)
 async def process_request_endpoint(request: ToolsRequest):
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=500, detail="Missing API Key configuration.")
 
-    # 1. Setup Config with Thread ID
-    config = {"configurable": {"thread_id": request.session_id}}
+    # Admitted into the tool lane up front (429 when full, before the LLM is called).
+    # Tool calls and cut profiling only take a tool slot while they run.
+    return await request_flight.do(
+        request.model_dump_json(),
+        lambda: scheduler.submit_graph(request.session_id, run_process_request, request)
+    )
 
-    # 2. Check Existing State
-    current_state = graph.get_state(config)
-    existing_messages = current_state.values.get("messages", [])
 
-    input_messages = []
+def run_process_request(request: ToolsRequest):
+    # 1. Setup Config with Thread ID (+ per-request tool options, read by the tools directly)
+    trim_silence_options = dict(request.trim_silence_options or {})
+    if request.sequence_frame_rate:
+        trim_silence_options["frame_rate"] = request.sequence_frame_rate
 
-    # Only add System Prompt if this is a NEW conversation
-    if not existing_messages:
-        input_messages.append(SystemMessage(content=system_prompt))
+    config = {"configurable": {
+        "thread_id": request.session_id,
+        "trim_silence_options": trim_silence_options
+    }}
+
+    # 2. Pick the graph variant for the tools /get_intent asked for
+    # (the system prompt is added per turn by the agent node, trimmed to these tools)
+    intents = frozenset(name for name in (request.required_tools or []) if name in TOOLS_BY_INTENT)
+    graph = get_graph(intents or ALL_INTENTS)
+
+    input_messages = []
     
     # 3. Add Context dynamically based on what the Frontend sent
     text_content = f"User Request: {request.message}\n"
@@ -374,7 +456,7 @@ async def process_request_endpoint(request: ToolsRequest):
     if request.image_transition_path:
         paths_str = json.dumps(request.image_transition_path)
         context_parts.append(f"image_transition_path (for 'add_transition'): {paths_str}")
-        context_parts.append("(See attached images for visual context of these clips)")
+        context_parts.append("(See [Cut Profiles] and any attached images for visual context of these clips)")
 
     # Context for Lip Sync
     if request.curseword_detect_path:
@@ -396,14 +478,18 @@ async def process_request_endpoint(request: ToolsRequest):
     # 1. Add the Text Block first
     message_content.append({"type": "text", "text": text_content})
     
-    # 2. Add Image Blocks
-    # This allows the AI to "see" the clips to determine the Vibe
+    # 2. Add Cut Profiles (and Image Blocks when needed)
+    # Each cut gets a compact numeric profile computed locally. The images are only
+    # attached when the vision mode asks for them (or the profile is not decisive).
     if request.image_transition_path:
         clips = request.image_transition_path
+        vision_mode = request.transition_vision_mode or TRANSITION_VISION_MODE
         
         # Safety check: Need at least 2 clips to have a transition
         if len(clips) >= 2:
             try:
+                profile_lines = []
+
                 for i in range(len(clips) - 1):
                     current_clip = clips[i]
                     next_clip = clips[i+1]
@@ -414,6 +500,8 @@ async def process_request_endpoint(request: ToolsRequest):
 
                     outgoing_clip_tail = current_clip[-1]
                     incoming_clip_head = next_clip[0]
+
+                    cut_paths = []
                     
                     # Iterate through both paths
                     for img_path in [outgoing_clip_tail, incoming_clip_head]:
@@ -430,8 +518,27 @@ async def process_request_endpoint(request: ToolsRequest):
                             
                             if not os.path.exists(clean_path):
                                 continue 
-                        
-                        # 3. Proceed to encode
+
+                        cut_paths.append(clean_path)
+
+                    # 3. Local visual analysis of the cut
+                    profile = None
+                    if len(cut_paths) == 2:
+                        try:
+                            with scheduler.tools.slot():
+                                profile = compute_cut_profile(cut_paths[0], cut_paths[1])
+                            profile_lines.append(describe_cut_profile(i, profile))
+                        except Exception as profile_err:
+                            print(f"Error profiling cut {i}: {profile_err}")
+
+                    if vision_mode == "features" and profile:
+                        continue
+                    if vision_mode == "auto" and profile and profile["decisive"]:
+                        continue
+
+                    # 4. Proceed to encode
+                    message_content.append({"type": "text", "text": f"Cut {i} (outgoing tail, incoming head):"})
+                    for clean_path in cut_paths:
                         try:
                             base64_image = encode_image(clean_path)
                             message_content.append({
@@ -444,6 +551,12 @@ async def process_request_endpoint(request: ToolsRequest):
                         except Exception as encode_err:
                             print(f"Error encoding {clean_path}: {encode_err}")
 
+                if profile_lines:
+                    message_content.append({
+                        "type": "text",
+                        "text": "[Cut Profiles]\n" + "\n".join(profile_lines)
+                    })
+
                 message_content.append({
                     "type": "text", 
                     "text": f"**[System Note]: Target Cut Count: {len(clips) - 1}**\n"
@@ -479,6 +592,14 @@ async def process_request_endpoint(request: ToolsRequest):
             try:
                 data = json.loads(msg.content)
                 action_type = data.get("action_type")
+
+                # Bulky payloads live in the result store; swap the summary for the full data
+                if data.get("result_id"):
+                    stored = load_result(data["result_id"])
+                    if stored is None:
+                        print(f"⚠️ Tool result {data['result_id']} not found in store.")
+                        continue
+                    data = stored
                 
                 # Check if it's a valid known tool
                 if action_type in ["trim_silence", "add_transition", "curseword_detect"]:
@@ -502,6 +623,17 @@ async def process_request_endpoint(request: ToolsRequest):
         commands=final_commands 
     )
 
+WORKER_STARTUP_SECONDS = 120
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
+
+    if WORKERS > 1:
+        # API workers only run the LLM graph; the models live in one inference process
+        if not INFERENCE_ADDRESS:
+            inference.spawn_server()
+        # Each worker re-imports this file (torch, langchain, ...) before it answers
+        # uvicorn's health check, which takes longer than the 5 s default
+        uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS, timeout_worker_healthcheck=WORKER_STARTUP_SECONDS)
+    else:
+        uvicorn.run(app, host=HOST, port=PORT)
\ No newline at end of file
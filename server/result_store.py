@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import uuid
+import glob
+from var import RESULT_STORE_DIR, RESULT_TTL_SECONDS
+
+RESULT_SUFFIX = ".json"
+
+
+# --- HELPER: HOUSEKEEPING ---
+def prune_results():
+    """Deletes results older than RESULT_TTL_SECONDS."""
+    cutoff = time.time() - RESULT_TTL_SECONDS
+    for path in glob.glob(os.path.join(RESULT_STORE_DIR, f"*{RESULT_SUFFIX}")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# --- MAIN: STORE / LOAD ---
+def save_result(payload: dict) -> str:
+    """
+    Keeps a full tool payload (every segment / marker) out of the LLM context.
+    Returns the id the tool puts in its summary instead. Results are plain files,
+    so any worker process can resolve them.
+    """
+    os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+    prune_results()
+
+    result_id = uuid.uuid4().hex
+    path = os.path.join(RESULT_STORE_DIR, f"{result_id}{RESULT_SUFFIX}")
+
+    # Write then rename, so a reader never sees a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+    return result_id
+
+def load_result(result_id: str):
+    """Returns the stored payload, or None if it expired or never existed."""
+    # Ids are uuid hex - reject anything else so it can't escape the folder
+    if not result_id or not result_id.isalnum():
+        return None
+
+    path = os.path.join(RESULT_STORE_DIR, f"{result_id}{RESULT_SUFFIX}")
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,202 @@
+import os
+import math
+import time
+import sqlite3
+import asyncio
+import threading
+import functools
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from var import INTERACTIVE_CONCURRENCY, TOOL_CONCURRENCY, TOOL_QUEUE_LIMIT, WORKERS, CHECKPOINT_DB
+
+# Initial guess for how long one job takes, used for Retry-After until we have data
+DEFAULT_JOB_SECONDS = 10.0
+EWMA_ALPHA = 0.2
+
+# Cross-process session leases (multi-worker mode)
+LEASE_SECONDS = 30              # A crashed worker blocks its session at most this long
+LEASE_RENEW_SECONDS = 10        # Heartbeat while the job runs, so long jobs keep their lease
+LEASE_POLL_SECONDS = 0.2
+
+
+# --- HELPER: ONE QUEUE + THREAD POOL PER KIND OF WORK ---
+class Lane:
+    """
+    A bounded pool of worker threads. Interactive LLM calls and CPU-bound tool
+    work get separate lanes so a long transcription never occupies a chat slot.
+
+    Jobs either run on the lane's own threads (run) or, once admitted, hold one
+    of its slots on the caller's thread (slot), e.g. a tool call inside a graph run.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_limit: int = None):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"{name}-lane")
+        self.pending = 0                    # Running + waiting jobs
+        self.avg_seconds = DEFAULT_JOB_SECONDS
+        self._slots = threading.Semaphore(concurrency)
+        self._count_lock = threading.Lock()
+
+    def admit(self):
+        """Reserve a place or reject with 429 when the queue is full (backpressure)."""
+        with self._count_lock:
+            if self.queue_limit is not None and self.pending >= self.concurrency + self.queue_limit:
+                waves = (self.pending - self.concurrency + 1) / self.concurrency
+                retry_after = max(1, math.ceil(self.avg_seconds * waves))
+                print(f"🚦 {self.name} lane full ({self.pending} jobs). Retry after {retry_after}s")
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Server is busy with {self.pending} analysis jobs. Please retry shortly.",
+                    headers={"Retry-After": str(retry_after)},
+                )
+            self.pending += 1
+
+    def release(self):
+        with self._count_lock:
+            self.pending -= 1
+
+    def record(self, elapsed: float):
+        self.avg_seconds = (1 - EWMA_ALPHA) * self.avg_seconds + EWMA_ALPHA * elapsed
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.record(time.monotonic() - start)
+
+    @contextmanager
+    def slot(self):
+        """
+        Blocks the calling thread until one of the lane's slots is free and holds it
+        for the block. The caller must already hold a place from admit().
+        """
+        with self._slots:
+            yield
+
+
+# --- HELPER: SESSION LEASES ACROSS WORKER PROCESSES ---
+class SessionLeases:
+    """
+    The asyncio lock only serializes a session inside one process. With several
+    workers, a lease row in the checkpoint database makes it exclusive across processes.
+    """
+
+    def __init__(self, db_path: str):
+        self.owner = str(os.getpid())
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_leases (session_id TEXT PRIMARY KEY, owner TEXT, expires REAL)"
+        )
+
+    def try_acquire(self, session_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self.conn.execute("DELETE FROM session_leases WHERE session_id = ? AND expires < ?", (session_id, now))
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO session_leases VALUES (?, ?, ?)",
+                (session_id, self.owner, now + LEASE_SECONDS)
+            )
+            return cursor.rowcount == 1
+
+    def renew(self, session_id: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE session_leases SET expires = ? WHERE session_id = ? AND owner = ?",
+                (time.time() + LEASE_SECONDS, session_id, self.owner)
+            )
+
+    def release(self, session_id: str):
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM session_leases WHERE session_id = ? AND owner = ?", (session_id, self.owner)
+            )
+
+    def run(self, session_id: str, fn, *args, **kwargs):
+        """
+        Runs fn while holding the session's lease. Called on the lane thread, so the
+        lease is only taken once the job actually starts; a heartbeat renews it until
+        fn returns.
+        """
+        while not self.try_acquire(session_id):
+            time.sleep(LEASE_POLL_SECONDS)
+
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(LEASE_RENEW_SECONDS):
+                self.renew(session_id)
+
+        renewer = threading.Thread(target=heartbeat, daemon=True)
+        renewer.start()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            done.set()
+            renewer.join()
+            self.release(session_id)
+
+
+# --- MAIN: SCHEDULER ---
+class Scheduler:
+    def __init__(self):
+        self.interactive = Lane("interactive", INTERACTIVE_CONCURRENCY)
+        self.tools = Lane("tools", TOOL_CONCURRENCY, TOOL_QUEUE_LIMIT)
+        # Graph runs block on the LLM and on tool slots, so they get their own threads
+        # (one per admitted tool request) and never take a /get_intent thread
+        self.graphs = Lane("graph", TOOL_CONCURRENCY + TOOL_QUEUE_LIMIT)
+        self._session_locks = {}            # session_id -> [asyncio.Lock, users]
+        self.leases = SessionLeases(CHECKPOINT_DB) if WORKERS > 1 else None
+
+    @asynccontextmanager
+    async def session(self, session_id: str):
+        """Serializes work on one session (inside this process) so graph runs never interleave checkpoint writes."""
+        entry = self._session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._session_locks[session_id]
+
+    async def submit(self, lane: Lane, session_id: str, fn, *args, **kwargs):
+        """
+        Admits the job into the lane (429 if full), waits for the session to be free,
+        then runs fn in the lane's thread pool. With several workers the job also
+        holds the session's cross-process lease while it runs.
+        """
+        lane.admit()
+        try:
+            if session_id is None:
+                return await lane.run(fn, *args, **kwargs)
+
+            async with self.session(session_id):
+                if self.leases is None:
+                    return await lane.run(fn, *args, **kwargs)
+                return await lane.run(self.leases.run, session_id, fn, *args, **kwargs)
+        finally:
+            lane.release()
+
+    async def submit_graph(self, session_id: str, fn, *args, **kwargs):
+        """
+        Runs a graph turn that may call tools. A tool-lane place is reserved up front
+        (429 if the queue is full) and held until the turn ends; the turn runs in the
+        graph lane and each tool call inside it waits for a tool slot.
+        """
+        self.tools.admit()
+        start = time.monotonic()
+        try:
+            return await self.submit(self.graphs, session_id, fn, *args, **kwargs)
+        finally:
+            self.tools.record(time.monotonic() - start)
+            self.tools.release()
+
+
+scheduler = Scheduler()
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DIGEST_CACHE_SIZE = 1024
+
+# path -> ((size, mtime_ns), digest), so re-sent files are not re-hashed.
+# Only the latest version of each path is kept, least recently used paths drop out.
+_digest_cache = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+# --- HELPER: FILE CONTENT HASH ---
+def file_digest(path: str) -> str:
+    """
+    Returns a content hash of the file. The UXP panel re-exports to the same
+    path every run, so the path alone cannot identify the audio.
+    """
+    stat = os.stat(path)
+    abs_path = os.path.abspath(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+
+    with _digest_lock:
+        cached = _digest_cache.get(abs_path)
+        if cached and cached[0] == version:
+            _digest_cache.move_to_end(abs_path)
+            return cached[1]
+
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _digest_lock:
+        _digest_cache[abs_path] = (version, digest)
+        _digest_cache.move_to_end(abs_path)
+        while len(_digest_cache) > DIGEST_CACHE_SIZE:
+            _digest_cache.popitem(last=False)
+
+    return digest
+
+def make_key(tool_name: str, audio_path: str, **params) -> str:
+    """Builds the single-flight key: (tool, file content hash, parameters)."""
+    return json.dumps(
+        [tool_name, file_digest(audio_path), params], sort_keys=True, default=str
+    )
+
+
+# --- MAIN: SINGLE-FLIGHT GROUP ---
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces duplicate in-flight calls. The first caller for a key runs the
+    function; callers arriving while it is still running wait and get the same
+    result (or the same exception). Nothing is cached after the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            print(f"🔗 Joining in-flight analysis ({call.waiters} waiting)")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+# Shared by every tool in this process
+analysis_flight = SingleFlight()
+
+
+# --- MAIN: ASYNC SINGLE-FLIGHT GROUP ---
+class AsyncSingleFlight:
+    """
+    Event-loop counterpart of SingleFlight for whole requests. The shared task is
+    shielded so a client that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key: str, coro_fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            print("🔗 Joining in-flight request")
+
+        return await asyncio.shield(task)
@@ -1,22 +1,27 @@
 import chromadb
 import json
 import ast
+from functools import lru_cache
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage, SystemMessage
 from fastapi import HTTPException
 from var import OPENROUTER_API_KEY
 from tools.create_transition_db import create_transition_db
+from inference import inference_task
 
-# Ensure directory exists or handle error if needed
-chroma_client = chromadb.PersistentClient(path="./transition_db")
+# Opened on first use, so API workers in multi-process mode never load the embedding model
+@lru_cache(maxsize=1)
+def get_transition_db():
+    # Ensure directory exists or handle error if needed
+    chroma_client = chromadb.PersistentClient(path="./transition_db")
 
-try:
-    transition_db = chroma_client.get_collection(
-        name="premiere_transitions"
-    )
-except:
-    print("Transition DB not found. Creating new collection...")
-    transition_db = create_transition_db()
+    try:
+        return chroma_client.get_collection(
+            name="premiere_transitions"
+        )
+    except:
+        print("Transition DB not found. Creating new collection...")
+        return create_transition_db()
 
 
 def robust_parse(input_str):
@@ -41,13 +46,14 @@ def robust_parse(input_str):
             print(f"❌ Failed to parse input: {input_str}")
             return []
 
+@inference_task("transition_search")
 def vector_search(query_vibe):
     """
     Simulates finding the closest transition in the user's specific list.
     """
     print(f"🤖 AI: Searching vector DB for vibe: {query_vibe}")
     
-    transition_result = transition_db.query(
+    transition_result = get_transition_db().query(
         query_texts=[query_vibe], 
         n_results=1
     )
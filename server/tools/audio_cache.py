@@ -0,0 +1,113 @@
+import os
+import glob
+import threading
+import numpy as np
+import torch
+import torchaudio
+import soundfile as sf
+from functools import lru_cache
+from singleflight import analysis_flight, file_digest
+from var import AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES
+
+# Every tool works on 16 kHz mono float32 (Silero VAD and whisper both expect it)
+TARGET_SR = 16000
+CACHE_SUFFIX = ".f32"
+
+
+# --- HELPER: DECODE + NORMALIZE ---
+@lru_cache(maxsize=8)
+def get_resampler(orig_sr: int, target_sr: int):
+    # Building the kernel is the expensive part, so keep one per rate pair
+    return torchaudio.transforms.Resample(orig_freq=orig_sr, new_freq=target_sr)
+
+def decode_audio(path: str, target_sr: int = TARGET_SR) -> np.ndarray:
+    """Reads any soundfile-supported file and returns 1-D float32 mono at target_sr."""
+    data, samplerate = sf.read(path, dtype="float32", always_2d=True)
+
+    # Handle Stereo: [Samples, Channels] -> [Samples]
+    mono = data.mean(axis=1)
+
+    # torchaudio resampling is pure math and doesn't rely on FFmpeg/Codecs
+    if samplerate != target_sr:
+        audio_tensor = torch.from_numpy(mono).unsqueeze(0)
+        mono = get_resampler(samplerate, target_sr)(audio_tensor).squeeze(0).numpy()
+
+    return np.ascontiguousarray(mono, dtype=np.float32)
+
+
+# --- HELPER: CACHE FILES ---
+def cache_path(digest: str) -> str:
+    return os.path.join(AUDIO_CACHE_DIR, f"{digest}_{TARGET_SR}{CACHE_SUFFIX}")
+
+def evict_cache(keep_path: str = None):
+    """Deletes least recently used entries until the cache fits AUDIO_CACHE_MAX_BYTES."""
+    entries = []
+    for path in glob.glob(os.path.join(AUDIO_CACHE_DIR, f"*{CACHE_SUFFIX}")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+
+    for _, size, path in sorted(entries):
+        if total <= AUDIO_CACHE_MAX_BYTES:
+            break
+        if path == keep_path:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            print(f"🧹 Evicted cached audio: {os.path.basename(path)}")
+        except OSError:
+            # Still mapped by another process (Windows) - try again next time
+            pass
+
+def write_cache(audio_path: str, target_path: str):
+    samples = decode_audio(audio_path)
+    os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+
+    # Write to a private temp file first, then rename atomically so other
+    # workers never map a half-written file
+    tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    samples.tofile(tmp_path)
+    os.replace(tmp_path, target_path)
+
+    print(f"💾 Cached normalized audio: {os.path.basename(target_path)} ({samples.nbytes / 1e6:.1f} MB)")
+    evict_cache(keep_path=target_path)
+
+def map_cache(target_path: str) -> np.ndarray:
+    if os.path.getsize(target_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # Copy-on-write mapping: zero-copy reads, and writable so torch can wrap it
+    return np.memmap(target_path, dtype=np.float32, mode="c")
+
+
+# --- MAIN: LOAD ---
+def load_audio_array(audio_path: str) -> np.ndarray:
+    """
+    Returns the 16 kHz mono float32 samples of audio_path as a memory map of the
+    cached file. Decoding and resampling happen once per file content.
+    """
+    target_path = cache_path(file_digest(audio_path))
+
+    if os.path.exists(target_path):
+        try:
+            os.utime(target_path)               # Mark as recently used
+        except OSError:
+            pass
+    else:
+        analysis_flight.do(f"normalize:{target_path}", write_cache, audio_path, target_path)
+
+    try:
+        return map_cache(target_path)
+    except FileNotFoundError:
+        # Evicted (by another worker) between the check above and the mapping
+        analysis_flight.do(f"normalize:{target_path}", write_cache, audio_path, target_path)
+        return map_cache(target_path)
+
+def load_audio_tensor(audio_path: str) -> torch.Tensor:
+    """Same as load_audio_array but wrapped as a [1, N] tensor (Silero expectation)."""
+    return torch.from_numpy(load_audio_array(audio_path)).unsqueeze(0)
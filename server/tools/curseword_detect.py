@@ -1,57 +1,143 @@
 import json
 import os
+from functools import lru_cache
 from faster_whisper import WhisperModel
 from better_profanity import profanity
 
 from langchain_core.tools import tool
+from singleflight import analysis_flight, make_key
+from result_store import save_result
+from inference import inference_task
+from tools.audio_cache import load_audio_array
+from tools.parallel_transcribe import SAMPLE_RATE, VAD_PARAMETERS, transcribe_words, transcribe_ranges
+from var import TRANSCRIBE_WORKERS, INFERENCE_CONCURRENCY, CURSEWORD_MODE, CURSEWORD_MODEL, CURSEWORD_SPOTTER_MODEL
 
-# Setup Models (Load once on server start)
+# Setup Models (Loaded once, on first use - API workers in multi-process mode never load them)
 PAD_SEC = 0.15
-model = WhisperModel("base", device="cpu", compute_type="int8")
 profanity.load_censor_words() 
 
+def get_whisper_model(chunked: bool = False):
+    """The single-pass model, or (chunked=True, TRANSCRIBE_WORKERS > 1) the one for parallel chunks."""
+    return load_whisper_model(chunked and TRANSCRIBE_WORKERS > 1)
+
+@lru_cache(maxsize=2)
+def load_whisper_model(chunked: bool):
+    # One CTranslate2 worker per concurrent tool job (INFERENCE_CONCURRENCY), otherwise
+    # every job - from every API worker in multi-process mode - queues on a single one
+    if not chunked:
+        # Single pass: cpu_threads=0 keeps the CTranslate2 default per job
+        return WhisperModel(CURSEWORD_MODEL, device="cpu", compute_type="int8", num_workers=INFERENCE_CONCURRENCY)
+
+    # Parallel chunks: one CTranslate2 worker per chunk of each job, the cores shared between a job's chunks
+    return WhisperModel(
+        CURSEWORD_MODEL,
+        device="cpu",
+        compute_type="int8",
+        cpu_threads=max(1, (os.cpu_count() or 1) // TRANSCRIBE_WORKERS),
+        num_workers=TRANSCRIBE_WORKERS * INFERENCE_CONCURRENCY,
+    )
+
+# Cascade mode: a cheap spotter pass flags segments, only those are re-transcribed
+CASCADE_WINDOW_PAD_SEC = 1.0    # Context kept around each flagged segment
+SPOTTER_MIN_LOGPROB = -1.0      # Low-confidence segments are re-checked too (the tiny model mishears)
+
+@lru_cache(maxsize=1)
+def get_spotter_model():
+    print(f"Loading spotter model ({CURSEWORD_SPOTTER_MODEL})...")
+    return WhisperModel(CURSEWORD_SPOTTER_MODEL, device="cpu", compute_type="int8", num_workers=INFERENCE_CONCURRENCY)
+
 def add_bad_words(words: list[str]):
     profanity.add_censor_words(words)
 
-def detect_cursed_words(audio_path):
-    print(f"Analyzing: {audio_path}")
+def words_to_markers(words) -> list:
+    markers = []
+
+    # Iterate linearly through the timeline
+    for word in words:
+        # Clean the word for checking (remove punctuation)
+        clean_word = word.word.strip(".,!?\"' ")
+        print(clean_word)
+        
+        # Check Profanity
+        if profanity.contains_profanity(clean_word):
+            
+            # Calculate duration
+            duration = word.end - word.start
+            
+            # Create the Marker Object
+            markers.append({
+                "start_seconds": round(word.start, 3),
+                "duration_seconds": round(duration, 3) + PAD_SEC,
+                "name": "PROFANITY",
+                "comment": f"Detected word: '{clean_word}' (Confidence: {int(word.probability * 100)}%)",
+                "color_index": 0 
+            })
+
+    return markers
 
-    # 2. Transcribe with Word Timestamps
-    # 'word_timestamps=True' is the magic key here
-    segments, info = model.transcribe(
-        audio_path, 
-        word_timestamps=True, 
-        language="en", 
+def spot_candidate_ranges(audio) -> list[tuple[int, int]]:
+    """
+    First cascade stage: segment-level transcription with the small model (no word
+    timestamps, greedy decoding). Returns merged sample windows around every segment
+    that contains a bad word or that the spotter was unsure about.
+    """
+    segments, _ = get_spotter_model().transcribe(
+        audio,
+        language="en",
+        beam_size=1,
+        condition_on_previous_text=False,
         vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=50)
+        vad_parameters=VAD_PARAMETERS
     )
 
-    markers = []
-
-    # 3. Iterate linearly through the timeline
+    windows = []
     for segment in segments:
-        for word in segment.words:
-            # Clean the word for checking (remove punctuation)
-            clean_word = word.word.strip(".,!?\"' ")
-            print(clean_word)
-            
-            # 4. Check Profanity
-            if profanity.contains_profanity(clean_word):
-                
-                # Calculate duration
-                duration = word.end - word.start
-                
-                # Create the Marker Object
-                markers.append({
-                    "start_seconds": round(word.start, 3),
-                    "duration_seconds": round(duration, 3) + PAD_SEC,
-                    "name": "PROFANITY",
-                    "comment": f"Detected word: '{clean_word}' (Confidence: {int(word.probability * 100)}%)",
-                    "color_index": 0 
-                })
-
-    # 5. Return JSON to UXP
-    return {"markers": markers}
+        if not profanity.contains_profanity(segment.text) and segment.avg_logprob >= SPOTTER_MIN_LOGPROB:
+            continue
+
+        start = max(0, int((segment.start - CASCADE_WINDOW_PAD_SEC) * SAMPLE_RATE))
+        end = min(len(audio), int((segment.end + CASCADE_WINDOW_PAD_SEC) * SAMPLE_RATE))
+
+        # Merge overlapping windows so no word is transcribed twice
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+
+    return [tuple(window) for window in windows]
+
+def detect_cursed_words(audio_path, mode: str = CURSEWORD_MODE, workers: int = TRANSCRIBE_WORKERS):
+    print(f"Analyzing: {audio_path} (mode: {mode})")
+
+    # Pass the cached 16 kHz samples so whisper skips its own decode + resample
+    audio = load_audio_array(audio_path)
+
+    if mode == "cascade":
+        # Stage 1: spot candidate windows. Stage 2: word timestamps only inside them
+        ranges = spot_candidate_ranges(audio)
+        flagged_seconds = sum(end - start for start, end in ranges) / SAMPLE_RATE
+        print(f"🔎 Spotter flagged {len(ranges)} windows ({flagged_seconds:.1f}s) for verification")
+        chunked = workers > 1 and len(ranges) > 1
+        words = transcribe_ranges(get_whisper_model(chunked), audio, ranges, workers=workers)
+    else:
+        # Full pass with Word Timestamps ('word_timestamps=True' is the magic key here).
+        # With workers > 1 the speech is split at silences and transcribed in parallel.
+        words = transcribe_words(
+            get_whisper_model(), audio, workers=workers,
+            chunk_model_factory=lambda: get_whisper_model(chunked=True)
+        )
+
+    # Return JSON to UXP
+    return {"markers": words_to_markers(words)}
+
+@inference_task("curseword_detect")
+def analyze_cursed_words(audio_path: str, additional_bad_words: list[str] = []):
+    # The word list is process state, so it is extended where the detection runs
+    add_bad_words(additional_bad_words)
+
+    # Duplicate requests for the same audio and word list share one transcription
+    key = make_key("curseword_detect", audio_path, extra_words=sorted(additional_bad_words), mode=CURSEWORD_MODE)
+    return analysis_flight.do(key, detect_cursed_words, audio_path)
 
 
 @tool
@@ -66,7 +152,7 @@ def curseword_detect_tool(audio_path: str, additional_bad_words: list[str] = [])
     Returns:
         str: A JSON string for UXP processing. Key fields for the Agent:
              - count (int): The total number of bad words found.
-             - markers (list): The technical data for Premiere Pro (includes word name/timestamp).
+             - result_id (str): Reference to the full marker data, sent to Premiere Pro automatically.
     """
     print(f"[TOOL] Running Curseword Detect on: {audio_path}")
     
@@ -74,14 +160,21 @@ def curseword_detect_tool(audio_path: str, additional_bad_words: list[str] = [])
         return json.dumps({"error": "File not found at path."})
     
     try:
-        add_bad_words(additional_bad_words)
-        markers = detect_cursed_words(audio_path)
-        return json.dumps({
+        markers = analyze_cursed_words(audio_path, list(additional_bad_words))
+
+        # Full marker list goes to the result store, the agent only sees the summary
+        result_id = save_result({
             "status": "success",
             "action_type": "curseword_detect",
             "markers": markers["markers"],
             "count": len(markers["markers"])
         })
+        return json.dumps({
+            "status": "success",
+            "action_type": "curseword_detect",
+            "count": len(markers["markers"]),
+            "result_id": result_id
+        })
     except Exception as e:
         return json.dumps({"error": str(e)})
 
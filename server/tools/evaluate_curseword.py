@@ -0,0 +1,83 @@
+"""
+Compares the curse word runs on a labeled set:
+- "full"     -> single-pass word-timestamp transcription
+- "parallel" -> the same, split into TRANSCRIBE_WORKERS chunks (only when TRANSCRIBE_WORKERS > 1)
+- "cascade"  -> spotter pass + verification of the flagged windows
+
+For "parallel" it also reports how many markers line up with the single pass.
+
+Usage (from the server folder):
+    python -m tools.evaluate_curseword labels.json
+
+labels.json:
+    [{"audio_path": "C:\\clips\\interview.wav", "starts": [12.4, 95.1]}, ...]
+where "starts" are the start times (seconds) of every labeled bad word.
+"""
+import sys
+import json
+import time
+from tools.curseword_detect import detect_cursed_words
+from var import TRANSCRIBE_WORKERS
+
+TOLERANCE_SEC = 0.5         # A marker this close to a label counts as a hit
+
+# run name -> (mode, workers)
+RUNS = {"full": ("full", 1)}
+if TRANSCRIBE_WORKERS > 1:
+    RUNS["parallel"] = ("full", TRANSCRIBE_WORKERS)
+RUNS["cascade"] = ("cascade", TRANSCRIBE_WORKERS)
+
+
+def count_hits(labels: list[float], markers: list[dict]) -> int:
+    found = [m["start_seconds"] for m in markers]
+    return sum(any(abs(label - start) <= TOLERANCE_SEC for start in found) for label in labels)
+
+def evaluate(label_file: str):
+    with open(label_file, "r") as f:
+        dataset = json.load(f)
+
+    totals = {run: {"hits": 0, "markers": 0, "seconds": 0.0} for run in RUNS}
+    agreement = {"matched": 0, "single": 0, "parallel": 0}
+    total_labels = 0
+
+    for item in dataset:
+        total_labels += len(item["starts"])
+        item_markers = {}
+
+        for run, (mode, workers) in RUNS.items():
+            start = time.perf_counter()
+            markers = detect_cursed_words(item["audio_path"], mode=mode, workers=workers)["markers"]
+            elapsed = time.perf_counter() - start
+            item_markers[run] = markers
+
+            hits = count_hits(item["starts"], markers)
+            totals[run]["hits"] += hits
+            totals[run]["markers"] += len(markers)
+            totals[run]["seconds"] += elapsed
+            print(f"{run:>8} | {item['audio_path']}: {hits}/{len(item['starts'])} hits, {elapsed:.1f}s")
+
+        if "parallel" in item_markers:
+            # Single-pass markers reproduced by the chunked run (same start within tolerance)
+            single_starts = [m["start_seconds"] for m in item_markers["full"]]
+            agreement["matched"] += count_hits(single_starts, item_markers["parallel"])
+            agreement["single"] += len(single_starts)
+            agreement["parallel"] += len(item_markers["parallel"])
+
+    print("\n--- SUMMARY ---")
+    for run, stats in totals.items():
+        recall = stats["hits"] / total_labels if total_labels else 1.0
+        print(f"{run:>8} | recall {recall:.3f} | markers {stats['markers']} | time {stats['seconds']:.1f}s")
+
+    if "parallel" in RUNS:
+        matched = agreement["matched"] / agreement["single"] if agreement["single"] else 1.0
+        print(f"parallel vs single pass | {agreement['matched']}/{agreement['single']} markers line up ({matched:.3f}) "
+              f"| {agreement['parallel']} parallel markers")
+    else:
+        print("Set TRANSCRIBE_WORKERS > 1 to compare parallel chunks against the single pass.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    evaluate(sys.argv[1])
@@ -0,0 +1,98 @@
+import av
+import numpy as np
+
+# Frames are downscaled to a fixed size so every metric is cheap and
+# the outgoing/incoming frames can be compared pixel-by-pixel.
+ANALYSIS_SIZE = (160, 90)
+HIST_BINS = 8               # Per channel -> 8x8x8 joint RGB histogram
+EDGE_THRESHOLD = 0.1        # Luma gradient magnitude counted as an "edge"
+
+# Cut classification thresholds (tuned on exported Premiere preview frames)
+SAME_SCENE_MAX_COLOR = 0.25
+SAME_SCENE_MAX_DIFF = 0.08
+SCENE_CHANGE_MIN_COLOR = 0.5
+SCENE_CHANGE_MIN_DIFF = 0.25
+
+LUMA_WEIGHTS = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)   # Rec. 709
+
+
+# --- HELPER: FRAME LOADING ---
+def load_frame(image_path: str) -> np.ndarray:
+    """
+    Decodes an image with PyAV (already installed for faster-whisper) and returns
+    a float32 RGB array in [0, 1] with shape [H, W, 3].
+    """
+    with av.open(image_path) as container:
+        frame = next(container.decode(video=0))
+        rgb = frame.reformat(
+            width=ANALYSIS_SIZE[0], height=ANALYSIS_SIZE[1], format="rgb24"
+        ).to_ndarray()
+
+    return rgb.astype(np.float32) / 255.0
+
+
+# --- HELPER: PER-FRAME FEATURES ---
+def luminance(rgb: np.ndarray) -> np.ndarray:
+    return rgb @ LUMA_WEIGHTS
+
+def color_histogram(rgb: np.ndarray) -> np.ndarray:
+    quantized = np.minimum((rgb * HIST_BINS).astype(np.int64), HIST_BINS - 1)
+    bins = (quantized[..., 0] * HIST_BINS + quantized[..., 1]) * HIST_BINS + quantized[..., 2]
+    hist = np.bincount(bins.ravel(), minlength=HIST_BINS ** 3).astype(np.float32)
+    return hist / hist.sum()
+
+def histogram_distance(hist_a: np.ndarray, hist_b: np.ndarray) -> float:
+    # Hellinger distance: 0 = identical palette, 1 = no overlap at all
+    overlap = np.sum(np.sqrt(hist_a * hist_b))
+    return float(np.sqrt(max(0.0, 1.0 - overlap)))
+
+def edge_density(luma: np.ndarray) -> float:
+    grad_x = np.abs(np.diff(luma, axis=1))[:-1, :]
+    grad_y = np.abs(np.diff(luma, axis=0))[:, :-1]
+    return float(np.mean((grad_x + grad_y) > EDGE_THRESHOLD))
+
+
+# --- MAIN: CUT PROFILE ---
+def classify_cut(color_distance: float, frame_difference: float):
+    """
+    Returns (cut_type, decisive). A decisive profile is clear enough that the
+    agent does not need to look at the images to pick a transition family.
+    """
+    if color_distance <= SAME_SCENE_MAX_COLOR and frame_difference <= SAME_SCENE_MAX_DIFF:
+        return "same_scene", True
+
+    if color_distance >= SCENE_CHANGE_MIN_COLOR or frame_difference >= SCENE_CHANGE_MIN_DIFF:
+        return "scene_change", True
+
+    return "ambiguous", False
+
+def compute_cut_profile(outgoing_path: str, incoming_path: str) -> dict:
+    outgoing = load_frame(outgoing_path)
+    incoming = load_frame(incoming_path)
+
+    luma_out = luminance(outgoing)
+    luma_in = luminance(incoming)
+
+    color_distance = histogram_distance(color_histogram(outgoing), color_histogram(incoming))
+    frame_difference = float(np.mean(np.abs(luma_out - luma_in)))
+    cut_type, decisive = classify_cut(color_distance, frame_difference)
+
+    return {
+        "luma_out": round(float(luma_out.mean()), 3),
+        "luma_in": round(float(luma_in.mean()), 3),
+        "color_distance": round(color_distance, 3),
+        "edges_out": round(edge_density(luma_out), 3),
+        "edges_in": round(edge_density(luma_in), 3),
+        "frame_difference": round(frame_difference, 3),
+        "cut_type": cut_type,
+        "decisive": decisive,
+    }
+
+def describe_cut_profile(cut_index: int, profile: dict) -> str:
+    """Compact one-line text version of a cut profile for the LLM prompt."""
+    return (
+        f"Cut {cut_index}: luma {profile['luma_out']}->{profile['luma_in']}, "
+        f"color distance {profile['color_distance']}, "
+        f"edge density {profile['edges_out']}->{profile['edges_in']}, "
+        f"frame difference {profile['frame_difference']} => {profile['cut_type']}"
+    )
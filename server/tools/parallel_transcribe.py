@@ -0,0 +1,96 @@
+import dataclasses
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+SAMPLE_RATE = 16000
+VAD_PARAMETERS = dict(min_silence_duration_ms=50)
+
+# Same options as the single-pass run, so every chunk is transcribed identically
+TRANSCRIBE_OPTIONS = dict(
+    word_timestamps=True,
+    language="en",
+    vad_filter=True,
+    vad_parameters=VAD_PARAMETERS,
+)
+
+# Below this much speech, splitting costs more than it saves
+MIN_SECONDS_PER_CHUNK = 30
+
+
+# --- HELPER: CHUNK PLANNING ---
+def plan_chunks(speech_regions: list[dict], total_samples: int, num_chunks: int) -> list[tuple[int, int]]:
+    """
+    Packs speech regions into up to num_chunks sample ranges with roughly equal
+    amounts of speech. Chunks only ever end in the middle of a silence between two
+    regions, so no word is split, and together they cover the whole timeline.
+    """
+    if not speech_regions or num_chunks <= 1:
+        return [(0, total_samples)]
+
+    lengths = np.array([r["end"] - r["start"] for r in speech_regions])
+    cumulative = np.cumsum(lengths)
+    target = cumulative[-1] / num_chunks
+
+    boundaries = [0]
+    for k in range(1, num_chunks):
+        # First region after which k/num_chunks of the speech has been covered
+        i = int(np.searchsorted(cumulative, target * k))
+        if i >= len(speech_regions) - 1:
+            break
+
+        cut = (speech_regions[i]["end"] + speech_regions[i + 1]["start"]) // 2
+        if cut > boundaries[-1]:
+            boundaries.append(cut)
+
+    boundaries.append(total_samples)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+# --- HELPER: ONE CHUNK ---
+def transcribe_chunk(model, audio: np.ndarray, start: int, end: int) -> list:
+    segments, _ = model.transcribe(audio[start:end], **TRANSCRIBE_OPTIONS)
+
+    # Shift word timestamps from chunk time back to the original timeline
+    offset = start / SAMPLE_RATE
+    return [
+        dataclasses.replace(word, start=word.start + offset, end=word.end + offset)
+        for segment in segments
+        for word in segment.words
+    ]
+
+
+# --- MAIN: TRANSCRIBE ---
+def transcribe_words(model, audio: np.ndarray, workers: int = 1, chunk_model_factory=None) -> list:
+    """
+    Returns every whisper Word of the 16 kHz audio, in timeline order.
+
+    With workers > 1 the speech is split at silences into chunks that are
+    transcribed concurrently, by the model chunk_model_factory returns (default:
+    model). That model must be built with num_workers >= workers for CTranslate2
+    to actually run them in parallel. Audio too short to split stays on model.
+    """
+    total_samples = len(audio)
+    num_chunks = 1
+
+    if workers > 1:
+        speech_regions = get_speech_timestamps(audio, VadOptions(**VAD_PARAMETERS))
+        speech_seconds = sum(r["end"] - r["start"] for r in speech_regions) / SAMPLE_RATE
+        num_chunks = max(1, min(workers, int(speech_seconds // MIN_SECONDS_PER_CHUNK)))
+
+    if num_chunks == 1:
+        return transcribe_chunk(model, audio, 0, total_samples)
+
+    chunks = plan_chunks(speech_regions, total_samples, num_chunks)
+    print(f"⚡ Transcribing {len(chunks)} chunks on {workers} workers")
+    chunk_model = chunk_model_factory() if chunk_model_factory else model
+    return transcribe_ranges(chunk_model, audio, chunks, workers)
+
+def transcribe_ranges(model, audio: np.ndarray, ranges: list[tuple[int, int]], workers: int = 1) -> list:
+    """Transcribes the given non-overlapping sample ranges concurrently, in timeline order."""
+    if not ranges:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = executor.map(lambda chunk: transcribe_chunk(model, audio, *chunk), ranges)
+        return [word for chunk_words in results for word in chunk_words]
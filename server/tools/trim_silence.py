@@ -1,59 +1,60 @@
 import os
-import torch
 import json
-import torchaudio
-import soundfile as sf
+import threading
+import numpy as np
+from functools import lru_cache
 from silero_vad import load_silero_vad, get_speech_timestamps
 
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from singleflight import analysis_flight, make_key
+from result_store import save_result
+from inference import inference_task
+from tools.audio_cache import load_audio_tensor, TARGET_SR
+
+# Post-processing defaults. Override per request with the 'trim_silence_options'
+# field of /process_request (and 'sequence_frame_rate' for frame snapping).
+DEFAULT_SILENCE_OPTIONS = {
+    # Opt-in (0 = off): speech bursts shorter than this are cut with the silence around
+    # them. Silero never reports speech under 0.25 s (min_speech_duration_ms), so every
+    # burst it returns may be a real short word ("yes", "no"); values from 0.25 s up cut those.
+    "merge_gap_seconds": 0.0,
+    "min_silence_seconds": 0.5,     # Shorter gaps are left alone
+    "head_padding_seconds": 0.1,    # Silence kept after speech ends
+    "tail_padding_seconds": 0.1,    # Silence kept before speech resumes
+    "frame_rate": None,             # Snap cut points to this frame rate (None = no snapping)
+}
 
 # 2. Setup VAD Model (Silero)
-try:
-    print("Loading VAD model... (this may take a moment)")
-    vad_model = load_silero_vad()
-except Exception as e:
-    print(f"Error loading VAD model: {e}")
-    vad_model = None
-
-
-# --- HELPER: LOGIC TO DETECT SILENCE ---
-# --- 1. NEW HELPER: SAFE AUDIO READER ---
-def read_audio_safe(path: str, target_sr: int = 16000):
-    data, samplerate = sf.read(path)
-
-    # Convert Numpy Array to Torch Tensor
-    audio_tensor = torch.FloatTensor(data)
-
-    # Handle Stereo (Convert to Mono if needed)
-    # If shape is [Samples, Channels] (e.g. 1000, 2), average to [1000]
-    if len(audio_tensor.shape) > 1:
-        audio_tensor = audio_tensor.mean(dim=1) 
-    
-    # Add dimension to match Silero expectation: [N] -> [1, N]
-    if audio_tensor.ndim == 1:
-        audio_tensor = audio_tensor.unsqueeze(0)
+# Loaded on first use, so API workers in multi-process mode never load it.
+# The model keeps recurrent state between calls, so runs on it are serialized.
+_vad_lock = threading.Lock()
 
-    # --- RESAMPLING ---
-    # Silero VAD works best at 16000Hz. 
-    # We use torchaudio.transforms (which is pure math and doesn't rely on FFmpeg/Codecs)
-    if samplerate != target_sr:
-        resampler = torchaudio.transforms.Resample(orig_freq=samplerate, new_freq=target_sr)
-        audio_tensor = resampler(audio_tensor)
+@lru_cache(maxsize=1)
+def get_vad_model():
+    try:
+        print("Loading VAD model... (this may take a moment)")
+        return load_silero_vad()
+    except Exception as e:
+        print(f"Error loading VAD model: {e}")
+        return None
 
-    return audio_tensor
 
-# --- 2. NEW HELPER: CALCULATE SILENCE TIMESTAMP ---
+# --- HELPER: CALCULATE SILENCE TIMESTAMP ---
 def calculate_silence_timestamps(audio_path: str, threshold: float = 0.5):
+    vad_model = get_vad_model()
     if not vad_model:
         raise RuntimeError("VAD model is not loaded. Cannot process audio.")
     
-    wav = read_audio_safe(audio_path)
-    speech_timestamps = get_speech_timestamps(
-        wav, vad_model, threshold=threshold, return_seconds=True
-    )
+    # 16 kHz mono, mapped from the normalized audio cache
+    wav = load_audio_tensor(audio_path)
+    with _vad_lock:
+        speech_timestamps = get_speech_timestamps(
+            wav, vad_model, threshold=threshold, return_seconds=True
+        )
     
     num_samples = wav.shape[1]
-    total_duration = num_samples / 16000
+    total_duration = num_samples / TARGET_SR
 
     silence_segments = []
     current_time = 0.0
@@ -70,12 +71,61 @@ def calculate_silence_timestamps(audio_path: str, threshold: float = 0.5):
     if current_time < total_duration:
         silence_segments.append([round(current_time, 2), round(total_duration, 2)])
 
-    return silence_segments
+    return silence_segments, total_duration
+
+@inference_task("trim_silence")
+def analyze_silence(audio_path: str, threshold: float = 0.5):
+    # Duplicate requests for the same audio share one VAD run
+    key = make_key("trim_silence", audio_path, threshold=threshold)
+    return analysis_flight.do(key, calculate_silence_timestamps, audio_path, threshold)
+
+# --- HELPER: POST-PROCESS SILENCE SEGMENTS ---
+def postprocess_silence_segments(
+    segments: list,
+    total_duration: float,
+    merge_gap_seconds: float = 0.0,
+    min_silence_seconds: float = 0.5,
+    head_padding_seconds: float = 0.1,
+    tail_padding_seconds: float = 0.1,
+    frame_rate: float = None,
+):
+    """
+    Turns raw VAD gaps into fewer, cleaner cuts. Every step works on the whole
+    [N, 2] array at once:
+    1. Merge gaps separated by less than merge_gap_seconds of "speech".
+    2. Pad: keep a little silence next to speech (not at the file start/end).
+    3. Snap inwards to frame boundaries, so a cut never eats into speech.
+    4. Drop gaps shorter than min_silence_seconds.
+    """
+    if not segments:
+        return []
+
+    seg = np.asarray(segments, dtype=np.float64)
+
+    # 1. Merge: a new group starts wherever the speech between two gaps is long enough
+    speech_between = seg[1:, 0] - seg[:-1, 1]
+    group_starts = np.flatnonzero(np.concatenate([[True], speech_between > merge_gap_seconds]))
+    starts = seg[group_starts, 0]
+    ends = np.maximum.reduceat(seg[:, 1], group_starts)
+
+    # 2. Padding
+    starts = np.where(starts > 0, starts + head_padding_seconds, starts)
+    ends = np.where(ends < round(total_duration, 2), ends - tail_padding_seconds, ends)
+
+    # 3. Frame snapping (rounded first so values already on a frame stay put)
+    if frame_rate:
+        starts = np.ceil(np.round(starts * frame_rate, 6)) / frame_rate
+        ends = np.floor(np.round(ends * frame_rate, 6)) / frame_rate
+
+    # 4. Minimum length
+    keep = (ends > starts) & ((ends - starts) >= min_silence_seconds)
+
+    return np.round(np.stack([starts[keep], ends[keep]], axis=1), 3).tolist()
 
 # --- TOOLS DEFINITION ---
 
 @tool
-def trim_silence_tool(audio_path: str):
+def trim_silence_tool(audio_path: str, config: RunnableConfig):
     """
     Scans the audio file to find silent sections that should be removed.
     
@@ -85,7 +135,8 @@ def trim_silence_tool(audio_path: str):
     Returns:
         str: A JSON string for UXP processing. Key fields for the Agent:
              - count (int): The total number of silent gaps found.
-             - segments (list): The technical timestamp data for Premiere Pro (Agent can ignore details).
+             - total_removed_seconds (float): The total duration of silence removed.
+             - result_id (str): Reference to the full timestamp data, sent to Premiere Pro automatically.
     """
     print(f"[TOOL] Running Trim Silence on: {audio_path}")
     
@@ -93,13 +144,30 @@ def trim_silence_tool(audio_path: str):
         return json.dumps({"error": "File not found at path."})
     
     try:
-        segments = calculate_silence_timestamps(audio_path)
-        return json.dumps({
+        raw_segments, total_duration = analyze_silence(audio_path)
+
+        # Per-request post-processing options (passed through the graph config, not by the agent)
+        options = dict(DEFAULT_SILENCE_OPTIONS)
+        request_options = config.get("configurable", {}).get("trim_silence_options") or {}
+        options.update({k: v for k, v in request_options.items() if k in DEFAULT_SILENCE_OPTIONS})
+
+        segments = postprocess_silence_segments(raw_segments, total_duration, **options)
+        print(f"✂️ {len(raw_segments)} raw gaps -> {len(segments)} cuts")
+
+        # Full segment list goes to the result store, the agent only sees the summary
+        result_id = save_result({
             "status": "success",
             "action_type": "trim_silence",
             "segments": segments,
             "count": len(segments)
         })
+        return json.dumps({
+            "status": "success",
+            "action_type": "trim_silence",
+            "count": len(segments),
+            "total_removed_seconds": round(sum(end - start for start, end in segments), 2),
+            "result_id": result_id
+        })
     except Exception as e:
         return json.dumps({"error": str(e)})
 
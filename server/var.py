@@ -7,11 +7,47 @@ if os.path.exists(".env"):
     load_dotenv(override=True)
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")     # Point at loadtest/llm_stub.py for offline runs
 OPENROUTER_MODEL = "google/gemini-2.5-flash-lite"
 
 MAX_TOKENS = 40000          # Change accordingly
 
+# How frames are sent for 'add_transition':
+#   "images"   -> always attach both frames of every cut (plus the cut profile)
+#   "auto"     -> attach frames only for cuts whose cut profile is not decisive
+#   "features" -> never attach frames, the agent only reads the cut profiles
+TRANSITION_VISION_MODES = ("images", "auto", "features")
+TRANSITION_VISION_MODE = os.getenv("TRANSITION_VISION_MODE", "auto")
+if TRANSITION_VISION_MODE not in TRANSITION_VISION_MODES:
+    raise ValueError(f"TRANSITION_VISION_MODE must be one of {TRANSITION_VISION_MODES}, got '{TRANSITION_VISION_MODE}'")
+
+# Scheduling: chat/LLM calls and CPU-heavy tool runs use separate worker pools.
+# When TOOL_CONCURRENCY jobs are running and TOOL_QUEUE_LIMIT more are waiting,
+# new tool requests get a 429 with a Retry-After header.
+# All three limits apply per API worker process (see WORKERS below).
+INTERACTIVE_CONCURRENCY = int(os.getenv("INTERACTIVE_CONCURRENCY", 8))
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", 2))
+TOOL_QUEUE_LIMIT = int(os.getenv("TOOL_QUEUE_LIMIT", 6))
+
+# Normalized (16 kHz mono float32) audio cache shared by all tools and worker processes
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "./audio_cache")
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+# Parallel whisper transcription: number of chunks transcribed concurrently (1 = single pass)
+TRANSCRIBE_WORKERS = max(1, int(os.getenv("TRANSCRIBE_WORKERS", 1)))
+
+# Curse word detection:
+#   "full"    -> word-timestamp transcription of all speech with CURSEWORD_MODEL
+#   "cascade" -> CURSEWORD_SPOTTER_MODEL flags candidate segments, only those are
+#                re-transcribed with word timestamps by CURSEWORD_MODEL
+CURSEWORD_MODE = os.getenv("CURSEWORD_MODE", "full")
+CURSEWORD_MODEL = os.getenv("CURSEWORD_MODEL", "base")
+CURSEWORD_SPOTTER_MODEL = os.getenv("CURSEWORD_SPOTTER_MODEL", "tiny")
+
+# Full tool payloads (segments, markers) are kept here instead of in the LLM context
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", "./tool_results")
+RESULT_TTL_SECONDS = int(os.getenv("RESULT_TTL_SECONDS", 3600))
+
 llm = ChatOpenAI(
     model=OPENROUTER_MODEL,
     api_key=OPENROUTER_API_KEY,
@@ -21,5 +57,17 @@ llm = ChatOpenAI(
 )
 
 
-PORT = int(os.getenv("PORT")) if os.getenv else 8000
-HOST = str(os.getenv("HOST")) if os.getenv else "localhost"
\ No newline at end of file
+PORT = int(os.getenv("PORT", 8000))
+HOST = os.getenv("HOST", "localhost")
+
+# Multi-process mode: WORKERS > 1 starts that many API workers plus one local
+# inference process that owns the whisper / Silero / Chroma models.
+# Every API worker admits up to TOOL_CONCURRENCY tool jobs, but they all share the
+# inference process, which runs at most INFERENCE_CONCURRENCY model jobs at once
+# (also the number of parallel whisper transcriptions). Size it for the whole
+# server, e.g. WORKERS * TOOL_CONCURRENCY, as far as the cores allow.
+WORKERS = max(1, int(os.getenv("WORKERS", 1)))
+INFERENCE_CONCURRENCY = max(1, int(os.getenv("INFERENCE_CONCURRENCY", TOOL_CONCURRENCY)))
+INFERENCE_ADDRESS = os.getenv("INFERENCE_ADDRESS", "")          # e.g. "localhost:8765"; empty = in-process models
+INFERENCE_AUTHKEY = os.getenv("INFERENCE_AUTHKEY", "")          # Required with INFERENCE_ADDRESS; generated when main.py spawns the server
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "checkpoints.sqlite")
\ No newline at end of file